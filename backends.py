@@ -0,0 +1,443 @@
+import numpy as np
+import os, time, argparse
+import itertools as it
+from collections import Counter
+from rich.console import Console
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+MISS, MISPLACED, EXACT = 0, 1, 2
+
+# Use a compact histogram when a row has fewer than 1/SPARSE_RATIO targets per possible pattern
+SPARSE_RATIO = 4
+
+# Number of patterns counted per bincount of a weighted histogram, bounding the repeated weights
+WEIGHTED_CHUNK = 2**18
+
+
+def pattern_dtype(n_l):
+    """Smallest unsigned integer type holding the 3**n_l patterns of words of length n_l."""
+    n_patterns = 3**n_l
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n_patterns - 1 <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.uint64)
+
+
+class NumpyBackend:
+    """
+    Compute kernels of the solver implemented with NumPy (and plain Python where NumPy does not help).
+
+    Attributes:
+        name (str): Name used to select the backend.
+    """
+    name = "numpy"
+
+    @staticmethod
+    def available():
+        """Whether the backend can be used on this host."""
+        return True
+
+    @staticmethod
+    def pattern_matrix(guess_array, target_array):
+        """
+        Computes the feedback patterns of every guess against every target.
+
+        Args:
+            guess_array (np.ndarray): Integer character codes of the guesses, of dimension (n_gw, n_l).
+            target_array (np.ndarray): Integer character codes of the targets, of dimension (n_tw, n_l).
+
+        Returns:
+            np.ndarray: Patterns of dimension (n_gw, n_tw), each stored as the integer whose
+                ternary representation is the list of MISS/MISPLACED/EXACT of the letters,
+                with the dtype given by pattern_dtype.
+        """
+        n_l = guess_array.shape[1]
+
+        # Initialize the feedback pattern matrix with MISS values
+        pattern_matrix = np.full((len(guess_array), len(target_array), n_l), MISS, dtype=np.uint8)
+
+        # Check for exact matches (EXACT positions)
+        for i in range(n_l):
+            exact_matches = guess_array[:, i:i+1] == target_array[:, i] # (n_gw, 1); row vector (n_tw, ) seen as a (n_tw, n_tw); the first is broadcaste to (n_gw, n_gw)
+            pattern_matrix[:, :, i][exact_matches] = EXACT
+
+        # Check for misplaced letters (MISPLACED positions)
+        for i, j in it.product(range(n_l), repeat=2):
+            if i != j:
+                misplaced_matches = (guess_array[:, i:i+1] == target_array[:, j]) & (pattern_matrix[:, :, j] != EXACT) & (pattern_matrix[:, :, i] != EXACT)
+                pattern_matrix[:, :, i][misplaced_matches] = MISPLACED
+
+        # Rather than representing a color pattern as a lists of integers,
+        # store it as a single integer, whose ternary representations corresponds
+        # to that list of integers.
+        dtype = pattern_dtype(n_l)
+        return np.dot(pattern_matrix, (3**np.arange(n_l)).astype(dtype)).astype(dtype, copy=False) # 0-242 for 5 letters
+
+    @staticmethod
+    def pattern_histogram(pattern_matrix, n_patterns, weights=None):
+        """
+        Counts how many targets give each pattern, for each guess.
+
+        Args:
+            pattern_matrix (np.ndarray): Patterns of dimension (n_gw, n_tw).
+            n_patterns (int): Number of possible patterns.
+            weights (np.ndarray): Optional weight of each target, of dimension (n_tw,); the counts are
+                then the sums of the weights of the targets.
+
+        Returns:
+            np.ndarray: Counts of dimension (n_gw, n_patterns).
+        """
+        n_rows, n_cols = pattern_matrix.shape
+        # Shift the patterns of each row to their own range, so that one bincount fills every row
+        offsets = np.arange(n_rows, dtype=np.intp)[:, None] * n_patterns
+        if weights is None:
+            flat = (pattern_matrix + offsets).ravel()
+            return np.bincount(flat, minlength=n_rows * n_patterns).reshape(n_rows, n_patterns)
+
+        # The weights are repeated for each row, so count chunks of rows to bound that copy
+        chunk = max(1, WEIGHTED_CHUNK // max(n_cols, 1))
+        repeated_weights = np.tile(weights, min(chunk, n_rows))
+        counts = np.empty((n_rows, n_patterns))
+        for start in range(0, n_rows, chunk):
+            block = pattern_matrix[start:start + chunk]
+            flat = (block + offsets[:len(block)]).ravel()
+            counts[start:start + chunk] = np.bincount(flat, weights=repeated_weights[:flat.size],
+                                                      minlength=len(block) * n_patterns).reshape(len(block), n_patterns)
+        return counts
+
+    @staticmethod
+    def compact_histogram(pattern_matrix, n_patterns, weights=None):
+        """
+        Counts how many targets give each pattern, for each guess, keeping only the patterns that occur.
+
+        Args:
+            pattern_matrix (np.ndarray): Patterns of dimension (n_gw, n_tw).
+            n_patterns (int): Number of possible patterns.
+            weights (np.ndarray): Optional weight of each target, of dimension (n_tw,).
+
+        Returns:
+            tuple: Counts of dimension (n_gw, min(n_tw, n_patterns)), where the non-zero counts of each
+                row come first, in increasing order of pattern; and the count of the last pattern
+                (the guess is the target) for each guess.
+        """
+        n_rows, n_cols = pattern_matrix.shape
+        width = min(n_cols, n_patterns)
+        dtype = np.int64 if weights is None else np.float64
+        if n_cols == 0:
+            return np.zeros((n_rows, 0), dtype=dtype), np.zeros(n_rows, dtype=dtype)
+        if weights is None:
+            sorted_patterns = np.sort(pattern_matrix, axis=1)
+        else:
+            # Sort the weights along with the patterns
+            order = np.argsort(pattern_matrix, axis=1)
+            sorted_patterns = np.take_along_axis(pattern_matrix, order, axis=1)
+            weights = weights[order].ravel()
+
+        # Number the runs of equal patterns of each row, and count the length of each run
+        run_starts = np.ones(sorted_patterns.shape, dtype=np.intp)
+        np.not_equal(sorted_patterns[:, 1:], sorted_patterns[:, :-1], out=run_starts[:, 1:], casting='unsafe')
+        run_ids = np.cumsum(run_starts, axis=1) - 1
+        offsets = np.arange(n_rows, dtype=np.intp)[:, None] * width
+        counts = np.bincount((run_ids + offsets).ravel(), weights=weights, minlength=n_rows * width).reshape(n_rows, width)
+
+        # The last pattern sorts last, so that it can only be the last run of a row
+        last_runs = counts[np.arange(n_rows), run_ids[:, -1]]
+        hits = np.where(sorted_patterns[:, -1] == n_patterns - 1, last_runs, 0)
+        return counts, hits
+
+    def histogram(self, pattern_matrix, n_patterns, weights=None):
+        """
+        Counts how many targets give each pattern, for each guess, using a compact histogram
+        when there are few targets for the number of possible patterns.
+
+        Args:
+            pattern_matrix (np.ndarray): Patterns of dimension (n_gw, n_tw).
+            n_patterns (int): Number of possible patterns.
+            weights (np.ndarray): Optional weight of each target, of dimension (n_tw,).
+
+        Returns:
+            tuple: Counts of dimension (n_gw, n_patterns), or (n_gw, n_tw) for the compact histogram;
+                and the count of the last pattern (the guess is the target) for each guess.
+        """
+        if pattern_matrix.shape[1] * SPARSE_RATIO < n_patterns:
+            return self.compact_histogram(pattern_matrix, n_patterns, weights)
+        counts = self.pattern_histogram(pattern_matrix, n_patterns, weights)
+        return counts, counts[:, n_patterns - 1]
+
+    @staticmethod
+    def get_pattern(guess, target):
+        """Generate the feedback pattern for a guess against a target word."""
+        counts = Counter(target)
+        results = []
+        for i, letter in enumerate(guess):
+            if guess[i] == target[i]:
+                results+=letter
+                counts[letter]-=1
+            else:
+                results+='+'
+
+        for i, letter in enumerate(guess):
+            if letter != target[i] and letter in target:
+                if counts[letter]>0:
+                    counts[letter]-=1
+                    results[i]='-'
+
+        return ''.join(results)
+
+    def get_patterns(self, guess, targets):
+        """Generate the feedback patterns for a guess against each target word."""
+        return [self.get_pattern(guess, target) for target in targets]
+
+
+if numba is not None:
+
+    @numba.njit(cache=True, nogil=True)
+    def _pattern_matrix_kernel(guess_array, target_array, out):
+        n_gw, n_l = guess_array.shape
+        n_tw = target_array.shape[0]
+        marks = np.empty(n_l, dtype=np.uint8)
+        for g in range(n_gw):
+            for t in range(n_tw):
+                for i in range(n_l):
+                    marks[i] = EXACT if guess_array[g, i] == target_array[t, i] else MISS
+                # Same rule as the NumPy backend: a letter is misplaced if it occurs at another
+                # position of the target, and neither position is an exact match
+                for i in range(n_l):
+                    if marks[i] == EXACT:
+                        continue
+                    for j in range(n_l):
+                        if i != j and marks[j] != EXACT and guess_array[g, i] == target_array[t, j]:
+                            marks[i] = MISPLACED
+                            break
+                code = 0
+                for i in range(n_l - 1, -1, -1):
+                    code = code * 3 + marks[i]
+                out[g, t] = code
+        return out
+
+    @numba.njit(cache=True, nogil=True)
+    def _pattern_histogram_kernel(pattern_matrix, n_patterns):
+        n_rows, n_cols = pattern_matrix.shape
+        counts = np.zeros((n_rows, n_patterns), dtype=np.int64)
+        for r in range(n_rows):
+            for c in range(n_cols):
+                counts[r, pattern_matrix[r, c]] += 1
+        return counts
+
+    @numba.njit(cache=True, nogil=True)
+    def _weighted_pattern_histogram_kernel(pattern_matrix, n_patterns, weights):
+        n_rows, n_cols = pattern_matrix.shape
+        counts = np.zeros((n_rows, n_patterns), dtype=np.float64)
+        for r in range(n_rows):
+            for c in range(n_cols):
+                counts[r, pattern_matrix[r, c]] += weights[c]
+        return counts
+
+    @numba.njit(cache=True, nogil=True)
+    def _feedback_kernel(guess, target_array):
+        # Wordle feedback, with letter counts: codes as above, one per target
+        n_tw, n_l = target_array.shape
+        out = np.empty(n_tw, dtype=np.int64)
+        marks = np.empty(n_l, dtype=np.uint8)
+        counts = np.zeros(256, dtype=np.int64)
+        for t in range(n_tw):
+            counts[:] = 0
+            for i in range(n_l):
+                counts[target_array[t, i]] += 1
+            for i in range(n_l):
+                if guess[i] == target_array[t, i]:
+                    marks[i] = EXACT
+                    counts[guess[i]] -= 1
+                else:
+                    marks[i] = MISS
+            for i in range(n_l):
+                if marks[i] == MISS and counts[guess[i]] > 0:
+                    counts[guess[i]] -= 1
+                    marks[i] = MISPLACED
+            code = 0
+            for i in range(n_l - 1, -1, -1):
+                code = code * 3 + marks[i]
+            out[t] = code
+        return out
+
+
+class NumbaBackend(NumpyBackend):
+    """Compute kernels compiled with Numba. Only available if numba is installed."""
+    name = "numba"
+
+    @staticmethod
+    def available():
+        return numba is not None
+
+    @staticmethod
+    def pattern_matrix(guess_array, target_array):
+        out = np.empty((len(guess_array), len(target_array)), dtype=pattern_dtype(guess_array.shape[1]))
+        return _pattern_matrix_kernel(np.ascontiguousarray(guess_array), np.ascontiguousarray(target_array), out)
+
+    @staticmethod
+    def pattern_histogram(pattern_matrix, n_patterns, weights=None):
+        if weights is None:
+            return _pattern_histogram_kernel(np.ascontiguousarray(pattern_matrix), n_patterns)
+        return _weighted_pattern_histogram_kernel(np.ascontiguousarray(pattern_matrix), n_patterns,
+                                                  np.ascontiguousarray(weights, dtype=np.float64))
+
+    def get_pattern(self, guess, target):
+        return self.get_patterns(guess, [target])[0]
+
+    def get_patterns(self, guess, targets):
+        guess_array = np.frombuffer(guess.encode(), dtype=np.uint8)
+        target_array = np.frombuffer("".join(targets).encode(), dtype=np.uint8).reshape(len(targets), len(guess))
+        codes = _feedback_kernel(guess_array, target_array)
+
+        # Decode each distinct code once into the '+', '-' and letters representation
+        symbols = {}
+        for code in np.unique(codes).tolist():
+            marks, curr = [], code
+            for letter in guess:
+                marks.append(letter if curr % 3 == EXACT else "-+"[curr % 3 == MISS])
+                curr //= 3
+            symbols[code] = "".join(marks)
+        return [symbols[code] for code in codes.tolist()]
+
+
+BACKENDS = {backend.name: backend for backend in (NumpyBackend, NumbaBackend)}
+
+
+def available_backends():
+    """Names of the backends usable on this host, fastest first."""
+    return [name for name in ("numba", "numpy") if BACKENDS[name].available()]
+
+
+def get_backend(name=None):
+    """
+    Returns a compute backend.
+
+    Args:
+        name (str): 'numpy', 'numba' or 'auto'. Defaults to the WORDLE_BACKEND environment
+            variable, or 'auto', which picks the fastest backend available.
+
+    Returns:
+        NumpyBackend: The backend instance.
+    """
+    name = name or os.environ.get("WORDLE_BACKEND", "auto")
+    if name == "auto":
+        name = available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}'. Choose among: auto, {', '.join(BACKENDS)}.")
+    if not BACKENDS[name].available():
+        raise ValueError(f"Backend '{name}' is not available on this host.")
+    return BACKENDS[name]()
+
+
+def overridden_kernels(backend):
+    """Names of the kernels that a backend implements itself, instead of inheriting them from NumpyBackend."""
+    kernels = ("pattern_matrix", "pattern_histogram", "compact_histogram", "get_patterns")
+    return [name for name in kernels if getattr(type(backend), name) is not getattr(NumpyBackend, name)]
+
+
+def check_parity(backend, words, reference=None):
+    """
+    Checks that the kernels a backend overrides give the same results as the reference (NumPy) backend.
+
+    Args:
+        backend (NumpyBackend): Backend to check.
+        words (list): Words used as guesses and targets.
+        reference (NumpyBackend): Backend taken as ground truth.
+
+    Returns:
+        list: Names of the kernels whose results differ.
+    """
+    reference = reference or NumpyBackend()
+    kernels = overridden_kernels(backend)
+    word_array = np.array([[ord(c) for c in word] for word in words], dtype=np.uint8)
+    expected = reference.pattern_matrix(word_array, word_array)
+    n_patterns = 3**word_array.shape[1]
+    weights = np.random.default_rng(0).random(len(words))
+    sample = expected[:, :n_patterns // (2 * SPARSE_RATIO)]
+    failures = []
+
+    if "pattern_matrix" in kernels and not np.array_equal(backend.pattern_matrix(word_array, word_array), expected):
+        failures.append("pattern_matrix")
+
+    if "pattern_histogram" in kernels:
+        if not np.array_equal(backend.pattern_histogram(expected, n_patterns), reference.pattern_histogram(expected, n_patterns)):
+            failures.append("pattern_histogram")
+        if not np.allclose(backend.pattern_histogram(expected, n_patterns, weights), reference.pattern_histogram(expected, n_patterns, weights)):
+            failures.append("weighted pattern_histogram")
+
+    if "compact_histogram" in kernels:
+        for name, sample_weights in (("compact_histogram", None), ("weighted compact_histogram", weights[:sample.shape[1]])):
+            counts, hits = backend.compact_histogram(sample, n_patterns, sample_weights)
+            expected_counts, expected_hits = reference.compact_histogram(sample, n_patterns, sample_weights)
+            if not (np.allclose(counts, expected_counts) and np.allclose(hits, expected_hits)):
+                failures.append(name)
+
+    if "get_patterns" in kernels and any(backend.get_patterns(guess, words) != reference.get_patterns(guess, words) for guess in words):
+        failures.append("get_patterns")
+
+    return failures
+
+
+def benchmark(backend, words, repeat=3):
+    """
+    Times each kernel of a backend, keeping the best of `repeat` runs.
+
+    Returns:
+        dict: Seconds per kernel.
+    """
+    word_array = np.array([[ord(c) for c in word] for word in words], dtype=np.uint8)
+    pattern_matrix = NumpyBackend.pattern_matrix(word_array, word_array)
+    n_patterns = 3**word_array.shape[1]
+    weights = np.random.default_rng(0).random(len(words))
+    kernels = {
+        "pattern_matrix": lambda: backend.pattern_matrix(word_array, word_array),
+        "pattern_histogram": lambda: backend.pattern_histogram(pattern_matrix, n_patterns),
+        "weighted_pattern_histogram": lambda: backend.pattern_histogram(pattern_matrix, n_patterns, weights),
+        "compact_histogram": lambda: backend.compact_histogram(pattern_matrix[:, :n_patterns // (2 * SPARSE_RATIO)], n_patterns),
+        "get_patterns": lambda: backend.get_patterns(words[0], words),
+    }
+
+    timings = {}
+    for kernel_name, kernel in kernels.items():
+        kernel() # warm up (JIT compilation)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            kernel()
+            best = min(best, time.perf_counter() - start)
+        timings[kernel_name] = best
+    return timings
+
+
+# python3 backends.py --words 1000
+if __name__ == '__main__':
+    import yaml
+    from guesser import Guesser
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--words', type=int, default=1000, help='Number of words used for the parity check and the benchmarks.')
+    parser.add_argument('--no-bench', action='store_true', help='Only check the parity of the backends.')
+    args = parser.parse_args()
+
+    console = Console()
+    words = yaml.load(open(Guesser.WORD_LIST), Loader=yaml.FullLoader)[:args.words]
+
+    failed = False
+    for name in available_backends():
+        backend = BACKENDS[name]()
+        failures = check_parity(backend, words)
+        failed |= bool(failures)
+        if failures:
+            console.print(f"[bold red]{name}: mismatch in {', '.join(failures)}[/bold red]")
+        else:
+            console.print(f"[bold green]{name}: {', '.join(overridden_kernels(backend)) or 'no kernel'} overridden, all match the numpy backend[/bold green]")
+
+        if not args.no_bench:
+            for kernel_name, seconds in benchmark(backend, words).items():
+                console.print(f"  {kernel_name}: {seconds * 1000:.2f} ms")
+
+    raise SystemExit(failed)
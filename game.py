@@ -109,10 +109,25 @@ if __name__ == '__main__':
     parser.add_argument('--profile', action='store_true', help='Enable profiling with snakeviz visualization')
     parser.add_argument('--save', type=str, help='Save histogram plot of guesses distribution to a file.')
     parser.add_argument('--print', action="store_true", help='Enable print of the game.')
+    parser.add_argument('--threads', type=int, default=1, help='Number of threads scoring the guesses.')
+    parser.add_argument('--block-size', type=int, help='Number of guesses scored per block (bounds the memory of each turn).')
+    parser.add_argument('--policy', type=str, help='Scoring policy of the guesser: entropy, expected_size, minimax, solve_probability, or weights such as entropy=1,solve_probability=0.5 (default: entropy).')
+    parser.add_argument('--no-prune', action='store_true', help='Score every guessable word at each turn.')
+    parser.add_argument('--endgame-size', type=int, default=Guesser.ENDGAME_SIZE, help='Only score the candidates when this many words or fewer are left (above 2, the guesses may change).')
+    parser.add_argument('--priors', action='store_true', help='Weight the candidate words by their frequency in data/wordlist.tsv.')
+    parser.add_argument('--weighted-secrets', action='store_true', help='Draw the secret words according to their frequency.')
+    parser.add_argument('--backend', type=str, choices=['auto', 'numpy', 'numba'], help='Compute backend (default: WORDLE_BACKEND or auto).')
     args = parser.parse_args()
     if args.r:
-        wordle = Wordle()
-        guesser = Guesser('console')
+        guesser = Guesser('console', backend=args.backend, n_threads=args.threads, block_size=args.block_size, policy=args.policy,
+                          prune=not args.no_prune, endgame_size=args.endgame_size, priors=args.priors)
+        if args.weighted_secrets:
+            # The priors are indexed like the matrix columns, i.e. the target words
+            generator = guesser.pattern_matrix_generator
+            priors = guesser.priors if guesser.priors is not None else generator.load_priors(guesser.FREQUENCY_LIST)
+            wordle = Wordle(guesser.word_list, weights=priors[generator.get_indices(guesser.word_list)])
+        else:
+            wordle = Wordle()
 
         def run_games():
             n = range(args.r) if args.print else tqdm(range(args.r), desc="Running Games", unit="game")
@@ -131,10 +146,13 @@ if __name__ == '__main__':
                 Game.score(results, guesses)
 
         # Decide whether to profile based on the '--profile' command-line argument
-        if args.profile:
-            run_games_with_profiling(run_games)
-        else:
-            run_games_without_profiling(run_games)
+        try:
+            if args.profile:
+                run_games_with_profiling(run_games)
+            else:
+                run_games_without_profiling(run_games)
+        finally:
+            guesser.close()
         # Continue with the summary calculation and printing
         success_rate = RESULTS.count(True) / len(RESULTS) * 100
         print("\n\n---- Game Summary ----")
@@ -143,6 +161,9 @@ if __name__ == '__main__':
         if GUESSES:
             avg_guesses = sum(GUESSES) / len(GUESSES)
             print(f"Average number of guesses: {avg_guesses:.2f}")
+        if guesser.pruning_totals["turns"]:
+            avg_skipped = guesser.pruning_totals["skipped"] / guesser.pruning_totals["turns"]
+            print(f"Average number of words skipped by pruning per turn: {avg_skipped:.0f} of {len(guesser.word_list)}")
         
         if args.save:
             save_guesses_histogram(GUESSES, file=args.save)
@@ -153,7 +174,7 @@ if __name__ == '__main__':
 
     else:
         # For manual play, profiling might not be as relevant
-        guesser = Guesser('manual')
+        guesser = Guesser('manual', backend=args.backend, policy=args.policy, priors=args.priors)
         wordle = Wordle()
         print('Welcome! Let\'s play wordle! ')
         Game.game(wordle, guesser)
@@ -1,11 +1,13 @@
 import numpy as np
 import os, re
-from scipy.stats import entropy
 import itertools as it
 import yaml
+from scipy.special import xlogy
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
 
 from matrix_generator import PatternMatrixGenerator
+from scoring import get_policy
 
 
 
@@ -14,10 +16,35 @@ class Guesser:
 
     DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)),"data")
     WORD_LIST = os.path.join(DATA_DIR, "wordlist.yaml")
+    FREQUENCY_LIST = os.path.join(DATA_DIR, "wordlist.tsv")
+    DEFAULT_FIRST_GUESS = "sound"
+    CACHED_OPENER = object()  # Default of get_best_guess(first_guess=...): the cached opener, or DEFAULT_FIRST_GUESS
+    DEFAULT_BLOCK_SIZE = 512
+    ENDGAME_SIZE = 2
+    PRUNING_TOLERANCE = 1e-9
 
-    def __init__(self, manual):
-        """Initialize the Guesser with a word list and setup for manual or automated guessing."""
-        self.word_list = self.get_word_list(isTrain=True) # 4270 if True; 2315 if False
+    def __init__(self, manual, mmap_mode=None, backend=None, n_threads=1, block_size=None, policy=None, word_list=None,
+                 prune=True, endgame_size=ENDGAME_SIZE, priors=False):
+        """Initialize the Guesser with a word list and setup for manual or automated guessing.
+
+        Args:
+            manual (str): 'manual' to prompt the user for guesses, anything else to guess automatically.
+            mmap_mode (str): If set, memory-map the pattern matrix (see PatternMatrixGenerator).
+            backend (str): Compute backend for the pattern matrix and histograms (see backends.get_backend).
+            n_threads (int): Number of threads scoring blocks of guesses in parallel.
+            block_size (int): Number of guesses per block. Bounds the memory of the gathered submatrix
+                and histograms; by default, all guesses are scored at once with one thread,
+                or in blocks of DEFAULT_BLOCK_SIZE with several.
+            policy (str or ScoringPolicy): How guesses are ranked (see scoring.get_policy); entropy by default.
+            word_list (list): Words of any length, all of the same one; defaults to the 5-letter word list.
+            prune (bool): Skip the guesses whose score is bounded below the best candidate's. Only applies
+                to policies without negative weights, and never changes the chosen guess.
+            endgame_size (int): With this many target words or fewer, only score the candidates. Up to 2,
+                this never changes the chosen guess; larger values trade guesses for speed.
+            priors (bool): Weight the target words by their frequency in FREQUENCY_LIST, instead of
+                treating them as equally likely.
+        """
+        self.word_list = word_list or self.get_word_list(isTrain=True) # 4270 if True; 2315 if False
 
         self._manual = manual
         self.console = Console()  # Console object for interactive output
@@ -26,9 +53,42 @@ class Guesser:
         self.target_words = self.word_list
 
         # Initialize PatternMatrixGenerator and load or generate the pattern matrix
-        self.pattern_matrix_generator = PatternMatrixGenerator(self.word_list)
+        self.pattern_matrix_generator = PatternMatrixGenerator(self.word_list, mmap_mode=mmap_mode, backend=backend)
+        self.backend = self.pattern_matrix_generator.backend
+        self.n_patterns = self.pattern_matrix_generator.n_patterns
         self.pattern_matrix_generator.get_pattern_matrix(self.word_list, self.word_list)
 
+        self.policy = get_policy(policy)
+
+        # Prior probability of each target word, indexed like the pattern matrix columns
+        self.priors = self.pattern_matrix_generator.load_priors(self.FREQUENCY_LIST) if priors else None
+
+        # Split the guesses in blocks, scored by a pool of threads (NumPy releases the GIL)
+        self.n_threads = n_threads
+        self.block_size = block_size or (self.DEFAULT_BLOCK_SIZE if n_threads > 1 else len(self.word_list))
+        self.guess_indices = self.pattern_matrix_generator.get_indices(self.word_list)
+        self._executor = ThreadPoolExecutor(n_threads) if n_threads > 1 else None
+
+        # Prune the guesses using bounds on their scores
+        self.prune = prune
+        self.endgame_size = endgame_size
+        self.letters = self.pattern_matrix_generator.words_to_int_arrays(self.pattern_matrix_generator.guessable_word_list)  # Indexed like the matrix
+        self.pruning_stats = None  # Targets, scored and skipped guesses of the last turn
+        self.pruning_totals = {"turns": 0, "targets": 0, "scored": 0, "skipped": 0}  # Sums over all the turns
+
+        # Use the opener computed by opener_search.py for this word list and settings, if any,
+        # otherwise the default one, or the best guess if the default does not fit the word list
+        default_first_guess = self.DEFAULT_FIRST_GUESS if self.DEFAULT_FIRST_GUESS in self.word_list else None
+        self.first_guess = self.pattern_matrix_generator.load_opener(self.opener_settings()) or default_first_guess
+
+
+    def opener_settings(self):
+        """Settings that change the games played from an opener, and so the best opener."""
+        return {
+            "policy": self.policy.name,
+            "priors": self.priors is not None,
+            "endgame_size": self.endgame_size,
+        }
 
     def get_word_list(self, isTrain = True):
         """Get the word list """
@@ -37,6 +97,18 @@ class Guesser:
         return open('data/wordle_list.txt').read().splitlines()
     
 
+    def close(self):
+        """Shut down the threads scoring the guesses; the Guesser then scores with the calling thread."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def restart_game(self, do_print = True):
         """Reset the game state for a new game."""
         if do_print:
@@ -55,36 +127,54 @@ class Guesser:
         self._tried.append(guess)
         return guess
 
-    def get_best_guess(self, result, do_print = True, first_guess = "sound"):
-        """Determine the best next guess based on the current game state and previous result."""
-        if not self._tried and first_guess is not None:
-            # For the first guess, use a fixed word to ensure consistent results
-            return first_guess
-        
-        if self._tried:
+    def get_best_guess(self, result, do_print = True, first_guess = CACHED_OPENER):
+        """Determine the best next guess based on the current game state and previous result.
+
+        Args:
+            result (str): Feedback pattern for the previous guess (ignored on the first turn).
+            do_print (bool): Print the top words and the chosen guess.
+            first_guess (str): Opening guess; defaults to the cached opener, or "sound" if none.
+                If None, the opening guess is computed like the following ones.
+        """
+        if not self._tried:
+            if first_guess is self.CACHED_OPENER:
+                first_guess = self.first_guess
+            if first_guess is not None:
+                # For the first guess, use a fixed word to ensure consistent results
+                return first_guess
+        else:
             # Filter the current possible words based on the last result and exclude tried words
             self.target_words = self.filter_words(result)
 
-        # Calculate the information value (entropy) for each possible word
-        information_dic = self.get_entropies()
-        
-        # First, sort by presence in self.target_words (True before False), then by entropy (decreasing)
-        word_entropy_pairs = sorted(information_dic.items(), 
-                                    key=lambda item: (-item[1], item[0] not in self.target_words))
-
-        
         if not self.target_words:
             raise ValueError("No words available. The word may not be present in the word list.")
+
+        word_entropy_pairs = self.rank_guesses()
         
         # Select the word with the maximum entropy as the best guess
-        max_entropy_word = word_entropy_pairs[0][0]
+        max_entropy_word, max_entropy = word_entropy_pairs[0]
 
         if do_print:
             self.print_top_information_values(word_entropy_pairs)
-            self.print_max_entropy_word(max_entropy_word, information_dic[max_entropy_word])
+            self.print_max_entropy_word(max_entropy_word, max_entropy)
+            self.print_pruning_stats()
 
         return max_entropy_word
 
+    def rank_guesses(self):
+        """Rank all guessable words against the current target words.
+
+        Returns:
+            list: (word, entropy) pairs of the scored words, best first.
+        """
+        # Calculate the information value (entropy) for each possible word
+        information_dic = self.get_entropies()
+
+        # First, sort by entropy or score (decreasing), then by presence in self.target_words (True before False)
+        target_words = set(self.target_words)
+        return sorted(information_dic.items(),
+                      key=lambda item: (-item[1], item[0] not in target_words))
+
     def filter_words(self, result):
         """Filter the current possible words based on the feedback pattern from the last guess."""
         pattern = self.build_regex(result)
@@ -121,7 +211,7 @@ class Guesser:
         pattern = ''
 
         # Construct the main pattern based on feedback
-        for i in range(5): # Example: [('e', '+'), ('e', '-'), ('r', '-'), ('i', '+'), ('e', '-')]
+        for i in range(len(previous_guess)): # Example: [('e', '+'), ('e', '-'), ('r', '-'), ('i', '+'), ('e', '-')]
             previous_guess_char, feedback_char = previous_guess[i], feedback_pattern[i]
             feedback_regex = ''
             if feedback_char.isalpha():
@@ -162,43 +252,129 @@ class Guesser:
     
 
     def get_entropies(self):
-        """Calculate the entropy for each possible word"""
-        # Get patterns for all possible words against current target words
-        pattern_matrix = self.pattern_matrix_generator.get_pattern_matrix(self.word_list, self.target_words)
-
-        # Calculate the probabilities for each pattern in each word
-        probabilities = self.get_probabilities(pattern_matrix)
-
-        # Calculate the entropy for each distribution
-        information_values_array = self.entropy_of_distributions(probabilities)
+        """Calculate the score of the policy (the entropy by default) for each possible word,
+        except the words that cannot be the best guess when pruning."""
+        target_indices = self.pattern_matrix_generator.get_indices(self.target_words)
+        n_targets = len(self.target_words)
+        # With priors, the counts of the histograms are sums of the probabilities of the targets
+        target_weights = None if self.priors is None else self.priors[target_indices]
+        total = n_targets if target_weights is None else target_weights.sum()
+        is_candidate = np.isin(self.guess_indices, target_indices)
+        candidate_rows = np.flatnonzero(is_candidate)
+
+        if not (self.prune and self.policy.bounded):
+            rows = np.arange(len(self.word_list))
+            information_values_array = self.score_rows(rows, target_indices, target_weights)
+
+        elif n_targets <= self.endgame_size:
+            # Endgame: a candidate is at least as good as any other word (exact up to 2 candidates)
+            rows = candidate_rows
+            information_values_array = self.score_rows(rows, target_indices, target_weights)
+
+        else:
+            # Score the candidates first: they win ties, so that the best of them is a threshold
+            # for the other words, whose scores are bounded by the entropy of their letters' feedback
+            candidate_values = self.score_rows(candidate_rows, target_indices, target_weights)
+            other_rows = np.flatnonzero(~is_candidate)
+            max_entropy = self.entropy_bounds(other_rows, target_indices, target_weights)
+            bounds = self.policy.upper_bound(total, max_entropy, np.zeros(len(other_rows)))
+            other_rows = other_rows[bounds + self.PRUNING_TOLERANCE >= candidate_values.max()]
+
+            rows = np.concatenate([candidate_rows, other_rows])
+            information_values_array = np.concatenate([candidate_values, self.score_rows(other_rows, target_indices, target_weights)])
+
+        self.pruning_stats = {
+            "targets": n_targets,
+            "scored": len(rows),
+            "skipped": len(self.word_list) - len(rows),
+        }
+        self.pruning_totals["turns"] += 1
+        for key, value in self.pruning_stats.items():
+            self.pruning_totals[key] += value
 
         # Map the entropy values back to the corresponding words
-        information_values = dict(zip(self.word_list, information_values_array))
+        information_values = dict(zip((self.word_list[row] for row in rows), information_values_array))
 
         return information_values
-    
-    
-    def get_probabilities(self, pattern_matrix):
-        # Initialize the distributions matrix
-        # Each row corresponds to a guess, and each column to a possible pattern (3^5 total patterns)
-        probabilities = np.zeros((len(self.word_list), 3**5))
 
-        # Fill the distributions matrix using advanced indexing
-        row_indices = np.arange(len(self.word_list))
-        # Use pattern_matrix as column indices to increment counts for corresponding patterns
-        np.add.at(probabilities, (row_indices[:, None], pattern_matrix), 1)
+    def score_rows(self, rows, target_indices, target_weights=None):
+        """Score the words at the given positions of the word list against the target words.
 
-        # Convert counts to probabilities
-        probabilities /= len(self.target_words)
+        Args:
+            rows (np.ndarray): Positions of the words to score in self.word_list.
+            target_indices (np.ndarray): Indices of the target words in the pattern matrix.
+            target_weights (np.ndarray): Optional prior probabilities of the target words.
 
-        return probabilities
+        Returns:
+            np.ndarray: Scores of the words, in the order of rows.
+        """
+        guess_indices = self.guess_indices[rows]
+        information_values_array = np.empty(len(rows))
+        total = len(target_indices) if target_weights is None else target_weights.sum()
+
+        def score_block(start):
+            # Get patterns for a block of possible words against current target words
+            stop = start + self.block_size
+            pattern_matrix = self.pattern_matrix_generator.get_pattern_block(guess_indices[start:stop], target_indices)
+
+            # Count the targets giving each pattern, for each word, and how many are the word itself
+            # (compact histograms when there are few targets for the 3**n_l patterns)
+            counts, hits = self.backend.histogram(pattern_matrix, self.n_patterns, target_weights)
+
+            # Score all the distributions in one pass
+            information_values_array[start:stop] = self.policy.score(counts, total, hits)
+
+        starts = range(0, len(rows), self.block_size)
+        if self._executor is None:
+            for start in starts:
+                score_block(start)
+        else:
+            # Consume the results to propagate exceptions from the threads
+            list(self._executor.map(score_block, starts))
+
+        return information_values_array
+
+    def entropy_bounds(self, rows, target_indices, target_weights=None):
+        """Bound the entropy of the pattern distribution of the words at the given positions of the word list.
+
+        The entropy of a pattern is at most the sum of the entropies of its letters' feedback,
+        which only need the frequencies of the letters of the targets, and no pattern matrix.
+        A letter is exact when the target has it at the same position, and absent when the target
+        does not contain it; otherwise it is misplaced, unless the guess repeats it, in which case
+        the split between misplaced and absent is the one of maximum entropy.
+
+        Args:
+            rows (np.ndarray): Positions of the words in self.word_list.
+            target_indices (np.ndarray): Indices of the target words in the pattern matrix.
+            target_weights (np.ndarray): Optional prior probabilities of the target words.
+
+        Returns:
+            np.ndarray: Upper bounds (in bits) of dimension (len(rows),), at most log2 of the number of targets.
+        """
+        target_letters = self.letters[target_indices]
+        weights = np.ones(len(target_indices)) if target_weights is None else target_weights
+        weights = weights / weights.sum()
+
+        # Probability that the target has each letter at each position, and anywhere
+        at_position = np.stack([np.bincount(column, weights, minlength=256) for column in target_letters.T])
+        contains = np.zeros((len(target_indices), 256), dtype=bool)
+        contains[np.arange(len(target_indices))[:, None], target_letters] = True
+        anywhere = weights @ contains
+
+        guess_letters = self.letters[self.guess_indices[rows]]
+        exact = at_position[np.arange(guess_letters.shape[1]), guess_letters]
+        # Clipped, since rounding errors would make the entropy NaN
+        absent = np.clip(1 - anywhere[guess_letters], 0, None)
+        misplaced = np.clip(anywhere[guess_letters] - exact, 0, None)
+
+        repeated = (guess_letters[:, :, None] == guess_letters[:, None, :]).sum(axis=2) > 1
+        absent, misplaced = (np.where(repeated, np.maximum(absent, (absent + misplaced) / 2), absent),
+                             np.where(repeated, np.minimum(misplaced, (absent + misplaced) / 2), misplaced))
+
+        feedback = np.stack([exact, misplaced, absent])
+        return np.minimum(-xlogy(feedback, feedback).sum(axis=(0, 2)) / np.log(2), np.log2(len(target_indices)))
 
-    
-    @staticmethod
-    def entropy_of_distributions(distributions):
-        return entropy(distributions, base=2, axis=1)
 
-    
     def print_top_information_values(self, information_values, n=10):
         """Prints the top n words with their corresponding information values."""
         
@@ -208,23 +384,28 @@ class Guesser:
         for word, value in top_10_information_values:
             self.console.print(f"{word}: {value:.4f}")
 
+    def print_pruning_stats(self):
+        """Print how many words were scored and skipped in the last turn."""
+        stats = self.pruning_stats
+        self.console.print(f"Scored Words: {stats['scored']} ({stats['skipped']} skipped by pruning)")
+
     def print_max_entropy_word(self, word, entropy):
-        """Print the word with the maximum entropy before making a guess."""
-        self.console.print(f"Next Guess (Max Entropy): [bold]{word}[/bold] with entropy [bold]{entropy:.4f}[/bold]")
+        """Print the word with the maximum entropy (or score of the policy) before making a guess."""
+        self.console.print(f"Next Guess (Max {self.policy.name}): [bold]{word}[/bold] with score [bold]{entropy:.4f}[/bold]")
         self.console.print(f"Total Possible Words: {len(self.target_words)}")
 
     @staticmethod
-    def pattern_to_int_list(pattern):
+    def pattern_to_int_list(pattern, n_l=5):
         result = []
         curr = pattern
-        for _ in range(5):
+        for _ in range(n_l):
             result.append(curr % 3)
             curr = curr // 3
         return result
 
     def pattern_to_string(self, pattern):
         d = {0: "+", 1: "-", 2: "l"}
-        return "".join(d[x] for x in self.pattern_to_int_list(pattern))
+        return "".join(d[x] for x in self.pattern_to_int_list(pattern, self.pattern_matrix_generator.n_l))
     
     @staticmethod
     def information(probabilities):
@@ -5,16 +5,19 @@ from rich.style import Style
 from collections import Counter
 from string import ascii_lowercase as al
 
+from backends import get_backend
+
 class GuesserHM:
     """A class to guess words in a Wordle-like game."""
 
-    def __init__(self, manual):
+    def __init__(self, manual, backend=None):
         """Initialize the Guesser with a word list and setup for manual or automated guessing."""
         self.word_list = yaml.load(open('wordlist.yaml'), Loader=yaml.FullLoader) # 4270
         # self.word_list = open('wordle_list.txt').read().splitlines() # 2315
 
         self._manual = manual
         self.console = Console()  # Console object for interactive output
+        self.backend = get_backend(backend)  # Compute backend generating the feedback patterns
 
         self._tried = []
         self.constraints = ["" for _ in range(5)]
@@ -158,26 +161,11 @@ class GuesserHM:
     def simulate_pattern(self, word):
         """Simulate feedback patterns for a word against all current possible words."""
         # Generate and return the list of feedback patterns
-        return [self.get_pattern(word, target) for target in self.current_words]
+        return self.backend.get_patterns(word, list(self.current_words))
 
     def get_pattern(self, guess, target):
         """Generate the feedback pattern for a guess against a target word."""
-        counts = Counter(target)
-        results = []
-        for i, letter in enumerate(guess):
-            if guess[i] == target[i]:
-                results+=letter
-                counts[letter]-=1
-            else:
-                results+='+'
-                
-        for i, letter in enumerate(guess):
-            if letter != target[i] and letter in target:
-                if counts[letter]>0:
-                    counts[letter]-=1
-                    results[i]='-'
-
-        return ''.join(results)
+        return self.backend.get_pattern(guess, target)
 
     def information(self, probabilities):
         """Calculate the entropy (information value) for a set of probabilities."""
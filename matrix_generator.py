@@ -1,8 +1,15 @@
 import numpy as np
-import os
+import os, hashlib, argparse, csv
 import itertools as it
+import multiprocessing as mp
+import yaml
 from rich.console import Console
 
+from backends import get_backend, pattern_dtype
+
+# Per-process state of the build workers, set up by init_build_worker
+_build_state = None
+
 class PatternMatrixGenerator:
     """
     A class to generate and manage a pattern matrix for a Wordle-like game.
@@ -11,7 +18,11 @@ class PatternMatrixGenerator:
         MISS (np.uint8): Constant for letters not in the word.
         MISPLACED (np.uint8): Constant for letters in the word but in the wrong position.
         EXACT (np.uint8): Constant for correct letters in the correct position.
-        PATTERN_MATRIX_FILE (str): Filename for saving the generated pattern matrix.
+        PATTERN_MATRIX_FILE (str): Filename for saving the generated pattern matrix, per word length.
+        OPENER_FILE (str): Filename for saving the best opener found by the opener search, per word length.
+        PARTIAL_SUFFIX (str): Suffix of the pattern matrix being built, and of its progress file.
+        CHECKSUM_SUFFIX (str): Suffix of the file holding the checksum of the built pattern matrix.
+        SLICE_SIZE (int): Default number of guess rows computed by each task of the parallel build.
     """
     MISS = np.uint8(0)      
     MISPLACED = np.uint8(1)  
@@ -19,14 +30,24 @@ class PatternMatrixGenerator:
     
     DATA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)),"data")
     ALPHABET = "abcdefghijklmnopqrstuvwxyz"
-    PATTERN_MATRIX_FILE = os.path.join(DATA_DIR, "pattern_matrix.npy")
+    PATTERN_MATRIX_FILE = os.path.join(DATA_DIR, "pattern_matrix_{n_l}.npy")
+    OPENER_FILE = os.path.join(DATA_DIR, "opener_{n_l}.yaml")
+    PARTIAL_SUFFIX = ".partial"
+    CHECKSUM_SUFFIX = ".sha256.yaml"
+    SLICE_SIZE = 256
 
-    def __init__(self, word_list):
+    def __init__(self, word_list, mmap_mode=None, backend=None):
         """
         Initializes the PatternMatrixGenerator with a given word list.
 
         Args:
-            word_list (list): List of all possible words used in the game.
+            word_list (list): List of all possible words used in the game, all of the same length.
+            mmap_mode (str): If set (e.g. 'r'), the pattern matrix is memory-mapped instead of
+                read into memory, so that several processes share the same pages.
+            backend (str): Compute backend generating the matrix (see backends.get_backend).
+            n_l (int): Length of the words.
+            n_patterns (int): Number of possible patterns, 3**n_l.
+            dtype (np.dtype): Integer type of the patterns (uint8 up to 5 letters, then uint16).
             grid (np.ndarray): The loaded or generated pattern matrix.
             words_to_index_map (dict): Maps words to their indices in the pattern matrix.
             console (Console): Console object for logging messages.
@@ -34,7 +55,17 @@ class PatternMatrixGenerator:
         self.target_word_list = word_list
         self.guessable_word_list = word_list
 
+        self.n_l = len(word_list[0])
+        if any(len(word) != self.n_l for word in word_list):
+            raise ValueError("All the words of the word list must have the same length.")
+        self.n_patterns = 3**self.n_l
+        self.dtype = pattern_dtype(self.n_l)
+        self.pattern_matrix_file = self.PATTERN_MATRIX_FILE.format(n_l=self.n_l)
+        self.opener_file = self.OPENER_FILE.format(n_l=self.n_l)
+
         self.grid = None
+        self.mmap_mode = mmap_mode
+        self.backend = get_backend(backend)
         self.words_to_index_map = dict(zip(self.guessable_word_list, it.count()))
 
         self.console = Console()
@@ -48,7 +79,7 @@ class PatternMatrixGenerator:
             words (list): List of words to convert.
 
         Returns:
-            np.ndarray: 2D array of integer character codes of dimension (len(words), 5).
+            np.ndarray: 2D array of integer character codes of dimension (len(words), n_l).
         """
         return np.array([[ord(c) for c in word] for word in words], dtype=np.uint8)
 
@@ -61,64 +92,245 @@ class PatternMatrixGenerator:
         """
         guess_words, target_words = self.guessable_word_list, self.target_word_list
         guess_array, target_array = self.words_to_int_arrays(guess_words), self.words_to_int_arrays(target_words) # (n_gw, n_l), (n_tw, n_l)
-        n_l = len(guess_words[0])
-
-        # Initialize the feedback pattern matrix with MISS values
-        pattern_matrix = np.full((len(guess_words), len(target_words), n_l), self.MISS, dtype=np.uint8)
-
-        # Check for exact matches (EXACT positions)
-        for i in range(n_l):
-            exact_matches = guess_array[:, i:i+1] == target_array[:, i] # (n_gw, 1); row vector (n_tw, ) seen as a (n_tw, n_tw); the first is broadcaste to (n_gw, n_gw)
-            pattern_matrix[:, :, i][exact_matches] = self.EXACT
-
-        # Check for misplaced letters (MISPLACED positions)
-        for i, j in it.product(range(n_l), repeat=2):
-            if i != j:
-                misplaced_matches = (guess_array[:, i:i+1] == target_array[:, j]) & (pattern_matrix[:, :, j] != self.EXACT) & (pattern_matrix[:, :, i] != self.EXACT)
-                pattern_matrix[:, :, i][misplaced_matches] = self.MISPLACED
-
-        # Rather than representing a color pattern as a lists of integers,
-        # store it as a single integer, whose ternary representations corresponds
-        # to that list of integers.
-        pattern_matrix = np.dot(pattern_matrix, (3**np.arange(n_l)).astype(np.uint8)) # 0-242
-        
-        return pattern_matrix
+
+        return self.backend.pattern_matrix(guess_array, target_array)
 
     def save_pattern_matrix(self, pattern_matrix):
         """
-        Saves the given pattern matrix to a file.
+        Saves the given pattern matrix to a file, with its checksum.
 
         Args:
             pattern_matrix (np.ndarray): The pattern matrix to save.
         """
-        np.save(self.PATTERN_MATRIX_FILE, pattern_matrix)
+        np.save(self.pattern_matrix_file, pattern_matrix)
+        self.save_checksum(self.matrix_digest(pattern_matrix))
 
     def load_pattern_matrix(self):
         """
         Loads the pattern matrix from a file, or generates and saves it if not present.
         """
-        #if os.path.exists(self.PATTERN_MATRIX_FILE):
-         #   os.remove(self.PATTERN_MATRIX_FILE)
+        #if os.path.exists(self.pattern_matrix_file):
+         #   os.remove(self.pattern_matrix_file)
+
+        # The file is only named after the word length, so it may hold the matrix of another word list
+        if os.path.exists(self.pattern_matrix_file):
+            stale = None
+            if not self.load_checksum():
+                stale = f"{self.pattern_matrix_file} has no checksum file, so its word list is unknown"
+            elif not self.matches_vocabulary():
+                stale = f"{self.pattern_matrix_file} was built for another word list"
+            if stale:
+                self.console.log(f"{stale}, rebuilding it.", style="bold yellow")
+                os.remove(self.pattern_matrix_file)
 
-        if not os.path.exists(self.PATTERN_MATRIX_FILE):
+        if not os.path.exists(self.pattern_matrix_file):
         
             self.console.log("\n".join([
-                    "Generating pattern matrix. This takes 20 seconds, but",
-                    "the result will be saved in a file so that it only",
-                    "needs to be computed once.", 
+                    "Generating pattern matrix on all the cores. This takes a",
+                    "little while, but the result will be saved in a file so",
+                    "that it only needs to be computed once.", 
                 ]), style="bold yellow")
             
-            # Generate the pattern matrix
-            pattern_matrix = self.generate_pattern_matrix()
-
-            # Save the generated matrix to a file
-            self.save_pattern_matrix(pattern_matrix)
+            # Generate the pattern matrix on all the cores, and save it to a file
+            self.build_pattern_matrix()
 
             # Log the completion of the matrix generation
             self.console.log("Pattern matrix generated and saved to file.",
                                 style="bold green")
 
-        self.grid = np.load(self.PATTERN_MATRIX_FILE)
+        self.grid = np.load(self.pattern_matrix_file, mmap_mode=self.mmap_mode)
+
+    def build_pattern_matrix(self, workers=None, slice_size=None):
+        """
+        Generates the pattern matrix with several processes, each writing slices of guess rows
+        directly into a memory-mapped .npy file. The progress is saved after each slice, so that
+        an interrupted build only computes the unfinished slices when run again.
+
+        Args:
+            workers (int): Number of worker processes; defaults to the number of CPUs.
+            slice_size (int): Number of guess rows per slice; defaults to SLICE_SIZE.
+
+        Raises:
+            ValueError: If the written matrix does not match the checksums of its slices.
+        """
+        workers = workers or os.cpu_count()
+        slice_size = slice_size or self.SLICE_SIZE
+        partial_file = self.pattern_matrix_file + self.PARTIAL_SUFFIX
+        progress_file = partial_file + ".yaml"
+        shape = (len(self.guessable_word_list), len(self.target_word_list))
+        layout = {
+            "vocabulary": self.vocabulary_digest(),
+            "shape": list(shape),
+            "dtype": self.dtype.name,
+            "slice_size": slice_size,
+        }
+
+        # Resume the previous build if it was for the same matrix, otherwise start over
+        progress = None
+        if os.path.exists(partial_file) and os.path.exists(progress_file):
+            with open(progress_file) as f:
+                progress = yaml.safe_load(f) or {}
+            if {key: progress.get(key) for key in layout} != layout:
+                progress = None
+        if progress is None:
+            np.lib.format.open_memmap(partial_file, mode='w+', dtype=self.dtype, shape=shape).flush()
+            progress = dict(layout, slices={})
+            self.save_build_progress(progress_file, progress)
+
+        starts = range(0, shape[0], slice_size)
+        todo = [start for start in starts if start not in progress["slices"]]
+        if len(todo) < len(starts):
+            self.console.log(f"Resuming the pattern matrix build: {len(todo)} slices left.", style="bold yellow")
+
+        initargs = (partial_file, self.guessable_word_list, self.target_word_list, self.backend.name)
+        if workers > 1 and len(todo) > 1:
+            pool = mp.Pool(workers, initializer=init_build_worker, initargs=initargs)
+            results = pool.imap_unordered(build_slice, [(start, start + slice_size) for start in todo])
+        else:
+            pool = None
+            init_build_worker(*initargs)
+            results = (build_slice((start, start + slice_size)) for start in todo)
+        try:
+            for start, digest in results:
+                progress["slices"][start] = digest
+                self.save_build_progress(progress_file, progress)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        # Read back every slice from the file, and check it against the digest of the worker
+        # while hashing the whole matrix, without copying it
+        pattern_matrix = np.load(partial_file, mmap_mode='r')
+        digest = hashlib.sha256()
+        corrupted = []
+        for start in starts:
+            block = pattern_matrix[start:start + slice_size]
+            digest.update(block)
+            if hashlib.sha256(block).hexdigest() != progress["slices"][start]:
+                corrupted.append(start)
+        if corrupted:
+            for start in corrupted:
+                del progress["slices"][start]
+            self.save_build_progress(progress_file, progress)
+            raise ValueError(f"Corrupted slices in {partial_file} (rows {corrupted}); run the build again to recompute them.")
+
+        del pattern_matrix, block
+        self.save_checksum(digest.hexdigest())
+        os.replace(partial_file, self.pattern_matrix_file)
+        os.remove(progress_file)
+
+    @staticmethod
+    def save_build_progress(progress_file, progress):
+        """Atomically saves the progress of a pattern matrix build."""
+        with open(progress_file + ".tmp", "w") as f:
+            yaml.safe_dump(progress, f, sort_keys=False)
+        os.replace(progress_file + ".tmp", progress_file)
+
+    @classmethod
+    def matrix_digest(cls, pattern_matrix):
+        """SHA-256 hex digest of a pattern matrix, hashed slice by slice so that a memory-mapped matrix is never copied whole."""
+        digest = hashlib.sha256()
+        for start in range(0, len(pattern_matrix), cls.SLICE_SIZE):
+            digest.update(np.ascontiguousarray(pattern_matrix[start:start + cls.SLICE_SIZE]))
+        return digest.hexdigest()
+
+    def save_checksum(self, sha256):
+        """Saves the checksum of the pattern matrix file, with the digest of the word list it was built for."""
+        with open(self.pattern_matrix_file + self.CHECKSUM_SUFFIX, "w") as f:
+            yaml.safe_dump({"vocabulary": self.vocabulary_digest(), "sha256": sha256}, f, sort_keys=False)
+
+    def load_checksum(self):
+        """Loads the checksum saved with the pattern matrix file, or an empty dict if there is none."""
+        checksum_file = self.pattern_matrix_file + self.CHECKSUM_SUFFIX
+        if not os.path.exists(checksum_file):
+            return {}
+        with open(checksum_file) as f:
+            return yaml.safe_load(f) or {}
+
+    def matches_vocabulary(self):
+        """
+        Tells whether the pattern matrix file was built for the current word list, without reading the matrix.
+
+        Returns:
+            bool: True if the checksum of the file records the digest of the current word list.
+        """
+        return self.load_checksum().get("vocabulary") == self.vocabulary_digest()
+
+    def verify_pattern_matrix(self):
+        """
+        Checks the pattern matrix file against the checksum saved when it was built.
+
+        Returns:
+            bool: True if the file matches its checksum and the current word list.
+        """
+        checksum = self.load_checksum()
+        if not (os.path.exists(self.pattern_matrix_file) and checksum):
+            return False
+        if checksum.get("vocabulary") != self.vocabulary_digest():
+            return False
+        return checksum.get("sha256") == self.matrix_digest(np.load(self.pattern_matrix_file, mmap_mode='r'))
+
+    def load_priors(self, frequency_file):
+        """
+        Loads prior weights of the words from their frequencies, aligned with the pattern matrix.
+
+        Args:
+            frequency_file (str): TSV file with 'word' and 'frequency' columns (see data/wordlist.tsv).
+
+        Returns:
+            np.ndarray: Probability of each target word, indexed like the columns of the pattern matrix.
+                Words missing from the file get the lowest frequency of the file.
+        """
+        with open(frequency_file, newline="") as f:
+            frequencies = {row["word"]: float(row["frequency"]) for row in csv.DictReader(f, delimiter="\t")}
+
+        lowest = min(frequencies.values())
+        priors = np.array([frequencies.get(word, lowest) for word in self.target_word_list])
+        return priors / priors.sum()
+
+    def vocabulary_digest(self):
+        """
+        Computes a digest of the word list, used to tell whether cached results still apply.
+
+        Returns:
+            str: SHA-1 hex digest of the guessable and target word lists.
+        """
+        words = "\n".join(self.guessable_word_list) + "\n\n" + "\n".join(self.target_word_list)
+        return hashlib.sha1(words.encode()).hexdigest()
+
+    def save_opener(self, opener, settings, stats=None):
+        """
+        Saves the best opener next to the pattern matrix cache.
+
+        Args:
+            opener (str): The opening guess to store.
+            settings (dict): Guesser settings the opener was computed with (see Guesser.opener_settings).
+            stats (dict): Optional statistics of the opener (e.g. total and average guesses).
+        """
+        data = {"opener": opener, "vocabulary": self.vocabulary_digest(), "settings": dict(settings)}
+        if stats:
+            data.update(stats)
+        with open(self.opener_file, "w") as f:
+            yaml.safe_dump(data, f, sort_keys=False)
+
+    def load_opener(self, settings):
+        """
+        Loads the cached opener, if it was computed for the current word list and guesser settings.
+
+        Args:
+            settings (dict): Settings of the guesser (see Guesser.opener_settings).
+
+        Returns:
+            str: The cached opener, or None if missing or computed for another vocabulary or settings.
+        """
+        if not os.path.exists(self.opener_file):
+            return None
+        with open(self.opener_file) as f:
+            data = yaml.safe_load(f) or {}
+        if data.get("vocabulary") != self.vocabulary_digest() or data.get("settings") != dict(settings):
+            return None
+        return data.get("opener")
     
     def get_pattern_matrix(self, guess_words, target_words):
         """
@@ -136,9 +348,82 @@ class PatternMatrixGenerator:
             self.load_pattern_matrix()
             
         # Map guess and target words to their indices in the pattern matrix
-        indices_guess_words = [self.words_to_index_map[w] for w in guess_words]
-        indices_target_words = [self.words_to_index_map[w] for w in target_words]
+        indices_guess_words = self.get_indices(guess_words)
+        indices_target_words = self.get_indices(target_words)
         
         # Return the relevant submatrix of the pattern matrix
         # Return pattern entries on the rows of the guess words and columns of the target words
-        return self.grid[np.ix_(indices_guess_words, indices_target_words)]
\ No newline at end of file
+        return self.get_pattern_block(indices_guess_words, indices_target_words)
+
+    def get_indices(self, words):
+        """
+        Maps words to their indices in the pattern matrix.
+
+        Args:
+            words (list): List of words.
+
+        Returns:
+            np.ndarray: Indices of the words.
+        """
+        return np.fromiter((self.words_to_index_map[w] for w in words), dtype=np.intp, count=len(words))
+
+    def get_pattern_block(self, indices_guess_words, indices_target_words):
+        """
+        Retrieves a submatrix of the pattern matrix from row and column indices.
+
+        Args:
+            indices_guess_words (np.ndarray): Row indices of the guess words.
+            indices_target_words (np.ndarray): Column indices of the target words.
+
+        Returns:
+            np.ndarray: Submatrix of dimension (len(indices_guess_words), len(indices_target_words)).
+        """
+        if self.grid is None:
+            self.load_pattern_matrix()
+        return self.grid[np.ix_(indices_guess_words, indices_target_words)]
+
+
+def init_build_worker(partial_file, guessable_word_list, target_word_list, backend):
+    """Opens the matrix being built and encodes the words once per worker process."""
+    global _build_state
+    _build_state = (
+        np.load(partial_file, mmap_mode='r+'),
+        PatternMatrixGenerator.words_to_int_arrays(guessable_word_list),
+        PatternMatrixGenerator.words_to_int_arrays(target_word_list),
+        get_backend(backend),
+    )
+
+
+def build_slice(bounds):
+    """Computes guess rows [start, stop) of the pattern matrix into the file, returning (start, sha256)."""
+    start, stop = bounds
+    pattern_matrix, guess_array, target_array, backend = _build_state
+    block = backend.pattern_matrix(guess_array[start:stop], target_array)
+    pattern_matrix[start:stop] = block
+    pattern_matrix.flush()
+    return start, hashlib.sha256(block).hexdigest()
+
+
+# python3 matrix_generator.py --workers 8
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the pattern matrix once, e.g. when building a deploy image.')
+    parser.add_argument('--word-list', type=str, default=os.path.join(PatternMatrixGenerator.DATA_DIR, "wordlist.yaml"), help='YAML word list (default: data/wordlist.yaml).')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: number of CPUs).')
+    parser.add_argument('--slice-size', type=int, help=f'Number of guess rows per task (default: {PatternMatrixGenerator.SLICE_SIZE}).')
+    parser.add_argument('--backend', type=str, choices=['auto', 'numpy', 'numba'], help='Compute backend (default: WORDLE_BACKEND or auto).')
+    parser.add_argument('--force', action='store_true', help='Rebuild the matrix even if it exists and matches its checksum.')
+    parser.add_argument('--verify', action='store_true', help='Only check the matrix against its checksum.')
+    args = parser.parse_args()
+
+    generator = PatternMatrixGenerator(yaml.load(open(args.word_list), Loader=yaml.FullLoader), backend=args.backend)
+    if args.verify:
+        valid = generator.verify_pattern_matrix()
+        generator.console.log(f"{generator.pattern_matrix_file}: {'OK' if valid else 'checksum mismatch or missing'}",
+                              style="bold green" if valid else "bold red")
+        raise SystemExit(not valid)
+
+    if not args.force and generator.verify_pattern_matrix():
+        generator.console.log(f"{generator.pattern_matrix_file} is up to date.", style="bold green")
+    else:
+        generator.build_pattern_matrix(args.workers, args.slice_size)
+        generator.console.log(f"Pattern matrix built and saved to {generator.pattern_matrix_file}.", style="bold green")
@@ -0,0 +1,205 @@
+import argparse, os
+import multiprocessing as mp
+from rich.console import Console
+
+from guesser import Guesser
+
+ALLOWED_GUESSES = 6
+
+# Per-process state of the worker pool, set up by init_worker
+_guesser = None
+_best_total = None
+
+
+class PrunedOpener(Exception):
+    """Raised when an opener can no longer match the best total found so far."""
+
+
+class OpenerSearch:
+    """
+    Evaluates opening guesses by simulating the Guesser on every target word.
+
+    Since the Guesser is deterministic, the games started by an opener form a decision
+    tree: each node is a guess, each bucket of targets sharing a feedback pattern is a child.
+    Walking the tree plays all the games at once, and a lower bound on the unexplored
+    buckets lets the evaluation stop as soon as the opener cannot beat the current best.
+
+    The feedback is Wordle's (see Wordle.get_matches), and the Guesser narrows its candidates
+    with it through Guesser.filter_words, exactly as in a game: the codes of the pattern matrix
+    mark repeated letters differently, so grouping the targets by them would play other games.
+    """
+
+    def __init__(self, guesser, best_total=None):
+        """
+        Args:
+            guesser (Guesser): Guesser whose policy is simulated.
+            best_total (multiprocessing.Value): Best total number of guesses found so far,
+                shared between processes. If None, no pruning is done.
+        """
+        self.guesser = guesser
+        self.backend = guesser.backend
+        self.best_total = best_total
+
+        self.total = 0
+        self.pending = 0
+        self.failures = 0
+
+    def candidate_openers(self, top_k=None):
+        """
+        Ranks all guessable words by their one-step score (entropy by default) against the whole word list.
+
+        Args:
+            top_k (int): Number of openers to return; all of them if None.
+
+        Returns:
+            list: Openers, best first.
+        """
+        self.guesser.target_words = self.guesser.word_list
+        openers = [word for word, _ in self.guesser.rank_guesses()]
+        return openers[:top_k] if top_k else openers
+
+    @staticmethod
+    def lower_bound(n, depth):
+        """Minimum total guesses to solve n targets when the next guess is number `depth`."""
+        # At most one target is solved by the next guess, the others need at least one more
+        return depth + (n - 1) * (depth + 1)
+
+    def evaluate(self, opener):
+        """
+        Plays the games for all target words starting with the given opener.
+
+        Args:
+            opener (str): The opening guess.
+
+        Returns:
+            dict: Total guesses, average guesses and number of failed games.
+
+        Raises:
+            PrunedOpener: If the opener cannot match the shared best total.
+        """
+        self.total, self.pending, self.failures = 0, 0, 0
+        targets = self.guesser.word_list
+        try:
+            self.play(opener, targets, targets, 1)
+        finally:
+            self.guesser.restart_game(do_print=False)
+        return {
+            "total_guesses": int(self.total),
+            "average_guesses": float(self.total / len(targets)),
+            "failures": int(self.failures),
+        }
+
+    def play(self, guess, candidates, targets, depth):
+        """
+        Plays `guess` as guess number `depth` against every target, then recurses on each bucket.
+
+        Args:
+            guess (str): The guess.
+            candidates (list): Words the Guesser still considers possible, its target_words.
+            targets (list): Secret words of the games reaching this guess.
+            depth (int): Number of the guess in these games.
+        """
+        buckets = {}
+        for word, feedback in zip(targets, self.backend.get_patterns(guess, targets)):
+            buckets.setdefault(feedback, []).append(word)
+
+        if buckets.pop(guess, None):
+            # The guess was the target word
+            self.total += depth
+            self.failures += depth > ALLOWED_GUESSES
+
+        bounds = {feedback: self.lower_bound(len(bucket), depth + 1) for feedback, bucket in buckets.items()}
+        self.pending += sum(bounds.values())
+        self.check_bound()
+
+        for feedback, bucket in buckets.items():
+            self.pending -= bounds[feedback]
+            # Let the Guesser filter its candidates and pick its next guess as in a game
+            self.guesser._tried = [guess]
+            self.guesser.target_words = candidates
+            next_guess = self.guesser.get_best_guess(feedback, do_print=False)
+            self.play(next_guess, self.guesser.target_words, bucket, depth + 1)
+
+    def check_bound(self):
+        """Stops the evaluation if the opener is already worse than the best one."""
+        # Ties are played out, so that search_opener breaks them by name whatever the worker order
+        if self.best_total is not None and self.total + self.pending > self.best_total.value:
+            raise PrunedOpener()
+
+
+def init_worker(best_total, guesser_options):
+    """Loads a Guesser in each worker, memory-mapping the pattern matrix so that it is shared."""
+    global _guesser, _best_total
+    _guesser = Guesser('console', mmap_mode='r', **guesser_options)
+    _best_total = best_total
+
+
+def evaluate_opener(opener):
+    """Evaluates one opener in a worker, returning (opener, stats) or (opener, None) if pruned."""
+    search = OpenerSearch(_guesser, _best_total)
+    try:
+        stats = search.evaluate(opener)
+    except PrunedOpener:
+        return opener, None
+
+    with _best_total.get_lock():
+        if stats["total_guesses"] < _best_total.value:
+            _best_total.value = stats["total_guesses"]
+    return opener, stats
+
+
+def search_opener(top_k=None, workers=None, console=None, **guesser_options):
+    """
+    Finds the opener that minimizes the total number of guesses over all target words.
+
+    Args:
+        top_k (int): Only evaluate the top-k openers by one-step entropy; all of them if None.
+        workers (int): Number of worker processes; defaults to the number of CPUs.
+        console (Console): Console object for logging messages.
+        **guesser_options: Settings of the simulated Guesser (policy, priors, endgame_size).
+
+    Returns:
+        tuple: The best opener, its statistics, and the settings of the Guesser.
+    """
+    console = console or Console()
+    # Also generates the pattern matrix if needed, before the workers map it
+    guesser = Guesser('console', **guesser_options)
+    openers = OpenerSearch(guesser).candidate_openers(top_k)
+    console.log(f"Evaluating {len(openers)} openers on {len(guesser.word_list)} target words.", style="bold yellow")
+
+    best_total = mp.Value('q', 2**62)
+    best_opener, best_stats = None, None
+    with mp.Pool(workers or os.cpu_count(), initializer=init_worker, initargs=(best_total, guesser_options)) as pool:
+        # Openers are submitted by decreasing score, so that good bounds are found early
+        for opener, stats in pool.imap_unordered(evaluate_opener, openers):
+            if stats is None:
+                continue
+            if best_stats is None or (stats["total_guesses"], opener) < (best_stats["total_guesses"], best_opener):
+                best_opener, best_stats = opener, stats
+                console.log(f"New best opener: [bold]{opener}[/bold] with {stats['average_guesses']:.4f} guesses on average")
+
+    return best_opener, best_stats, guesser.opener_settings()
+
+
+# python3 opener_search.py --top-k 50 --workers 8
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--top-k', type=int, help='Only evaluate the top-k openers by one-step entropy (default: all words).')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: number of CPUs).')
+    parser.add_argument('--policy', type=str, help='Scoring policy of the guesser, e.g. minimax or entropy=1,solve_probability=0.5 (default: entropy).')
+    parser.add_argument('--priors', action='store_true', help='Simulate a guesser weighting the candidates by their frequency.')
+    parser.add_argument('--endgame-size', type=int, default=Guesser.ENDGAME_SIZE, help='Endgame size of the simulated guesser.')
+    parser.add_argument('--no-save', action='store_true', help='Do not save the best opener in the cache.')
+    args = parser.parse_args()
+
+    console = Console()
+    opener, stats, settings = search_opener(args.top_k, args.workers, console,
+                                            policy=args.policy, priors=args.priors, endgame_size=args.endgame_size)
+    console.print(f"Best opener: [bold]{opener}[/bold]")
+    for key, value in {**stats, **settings}.items():
+        console.print(f"{key}: {value}")
+
+    if not args.no_save:
+        generator = Guesser('console').pattern_matrix_generator
+        generator.save_opener(opener, settings, stats)
+        console.log(f"Opener saved to {generator.opener_file}.", style="bold green")
@@ -0,0 +1,178 @@
+import numpy as np
+from scipy.special import xlogy
+
+
+def entropy(counts, total, hits):
+    """Shannon entropy (in bits) of the pattern distribution of each guess."""
+    # H = log2(N) - sum(c * log2(c)) / N, without normalizing the counts first
+    return np.log2(total) - xlogy(counts, counts).sum(axis=1) / (total * np.log(2))
+
+
+def expected_size(counts, total, hits):
+    """Expected number (or prior mass, with weighted counts) of candidates left after each guess."""
+    return np.einsum('ij,ij->i', counts, counts) / total
+
+
+def worst_case(counts, total, hits):
+    """Size (or prior mass) of the largest bucket of candidates left after each guess."""
+    return counts.max(axis=1)
+
+
+def solve_probability(counts, total, hits):
+    """Probability that each guess is the target word."""
+    return hits / total
+
+
+# Upper bounds of each metric times its sign, for a guess whose pattern distribution has
+# an entropy of at most `max_entropy` bits (e.g. log2 of the number of targets)
+
+def entropy_bound(total, max_entropy, hits):
+    return max_entropy
+
+
+def expected_size_bound(total, max_entropy, hits):
+    # The collision entropy -log2(sum(p**2)) is at most the Shannon entropy
+    return -total * np.exp2(-max_entropy)
+
+
+def worst_case_bound(total, max_entropy, hits):
+    # So is the min-entropy -log2(max(p))
+    return -total * np.exp2(-max_entropy)
+
+
+def solve_probability_bound(total, max_entropy, hits):
+    return hits / total
+
+
+METRIC_BOUNDS = {
+    "entropy": entropy_bound,
+    "expected_size": expected_size_bound,
+    "worst_case": worst_case_bound,
+    "solve_probability": solve_probability_bound,
+}
+
+# Metric name -> (function, sign), the sign making higher scores better
+METRICS = {
+    "entropy": (entropy, 1),
+    "expected_size": (expected_size, -1),
+    "worst_case": (worst_case, -1),
+    "solve_probability": (solve_probability, 1),
+}
+
+# Policies that can be selected by name
+POLICIES = {
+    "entropy": {"entropy": 1},
+    "expected_size": {"expected_size": 1},
+    "minimax": {"worst_case": 1},
+    "solve_probability": {"solve_probability": 1},
+}
+
+
+class ScoringPolicy:
+    """
+    Ranks guesses by a weighted sum of metrics of their pattern histograms.
+
+    Every metric is computed from the same histogram of counts, so that a combination
+    of metrics only adds a pass over that histogram per metric, and no extra histogram.
+    The metrics only depend on the non-zero counts of each row, so compact histograms work too.
+
+    Attributes:
+        name (str): Name of the policy, as accepted by get_policy.
+        weights (dict): Maps metric names to their weights.
+    """
+
+    def __init__(self, weights, name=None):
+        """
+        Args:
+            weights (dict): Maps metric names (keys of METRICS) to their weights.
+            name (str): Name of the policy; defaults to its specification.
+        """
+        unknown = set(weights) - set(METRICS)
+        if unknown:
+            raise ValueError(f"Unknown metrics: {', '.join(sorted(unknown))}. Choose among: {', '.join(METRICS)}.")
+        self.weights = dict(weights)
+        self.name = name or ",".join(f"{metric}={weight:g}" for metric, weight in self.weights.items())
+
+    def metrics(self, counts, total, hits):
+        """
+        Computes the metrics used by the policy.
+
+        Args:
+            counts (np.ndarray): Pattern histogram of dimension (n_guesses, n_patterns), or compact.
+            total (float): Number (or prior mass) of target words, the sum of each row of counts.
+            hits (np.ndarray): For each guess, the count of the targets equal to the guess.
+
+        Returns:
+            dict: Maps metric names to arrays of dimension (n_guesses,).
+        """
+        return {metric: METRICS[metric][0](counts, total, hits) for metric in self.weights}
+
+    def score(self, counts, total, hits):
+        """
+        Scores each guess; the higher, the better.
+
+        Args:
+            counts (np.ndarray): Pattern histogram of dimension (n_guesses, n_patterns), or compact.
+            total (float): Number (or prior mass) of target words, the sum of each row of counts.
+            hits (np.ndarray): For each guess, the count of the targets equal to the guess.
+
+        Returns:
+            np.ndarray: Scores of dimension (n_guesses,).
+        """
+        metrics = self.metrics(counts, total, hits)
+        if len(metrics) == 1:
+            (metric, values), = metrics.items()
+            sign = METRICS[metric][1]
+            weight = self.weights[metric]
+            return values if sign * weight == 1 else sign * weight * values
+        return sum(METRICS[metric][1] * weight * metrics[metric] for metric, weight in self.weights.items())
+
+    def upper_bound(self, total, max_entropy, hits):
+        """
+        Bounds the score of guesses from above, without their pattern histograms.
+
+        Args:
+            total (float): Number (or prior mass) of target words.
+            max_entropy (np.ndarray): For each guess, an upper bound on the entropy (in bits)
+                of its pattern distribution (see Guesser.entropy_bounds).
+            hits (np.ndarray): For each guess, the count of the targets equal to the guess.
+
+        Returns:
+            np.ndarray: Upper bounds of dimension (n_guesses,), or None if the policy cannot be
+                bounded (a negative weight turns the bound of a metric into a lower bound).
+        """
+        if not self.bounded:
+            return None
+        return sum(weight * METRIC_BOUNDS[metric](total, max_entropy, hits) for metric, weight in self.weights.items())
+
+    @property
+    def bounded(self):
+        """Whether upper_bound applies, that is, whether no metric has a negative weight."""
+        return all(weight >= 0 for weight in self.weights.values())
+
+
+def get_policy(policy=None):
+    """
+    Returns a scoring policy.
+
+    Args:
+        policy (str or ScoringPolicy): A policy name (see POLICIES), or a weighted combination
+            of metrics such as 'entropy=1,solve_probability=0.5'. Defaults to 'entropy'.
+
+    Returns:
+        ScoringPolicy: The scoring policy.
+    """
+    if isinstance(policy, ScoringPolicy):
+        return policy
+    policy = policy or "entropy"
+    if policy in POLICIES:
+        return ScoringPolicy(POLICIES[policy], name=policy)
+
+    weights = {}
+    for term in policy.split(","):
+        metric, _, weight = term.partition("=")
+        try:
+            weights[metric.strip()] = float(weight) if weight else 1.0
+        except ValueError:
+            raise ValueError(f"Invalid weight in policy term '{term}'.") from None
+    return ScoringPolicy(weights, name=policy)
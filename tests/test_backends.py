@@ -0,0 +1,79 @@
+import itertools as it
+
+import numpy as np
+import pytest
+import yaml
+
+from backends import NumpyBackend, NumbaBackend, overridden_kernels, pattern_dtype
+from guesser import Guesser
+from wordle import Wordle
+
+requires_numba = pytest.mark.skipif(not NumbaBackend.available(), reason="numba is not installed")
+
+# Repeated letters in the guess, the target, or both
+REPEATED_LETTERS = ["eerie", "geese", "speed", "abbey", "llama", "sassy", "error", "mamma", "puppy", "kayak", "steel", "sleet"]
+
+
+@pytest.fixture(scope="module")
+def words():
+    word_list = yaml.load(open(Guesser.WORD_LIST), Loader=yaml.FullLoader)
+    return REPEATED_LETTERS + [word for word in word_list[:300] if word not in REPEATED_LETTERS]
+
+
+def to_array(words):
+    return np.array([[ord(c) for c in word] for word in words], dtype=np.uint8)
+
+
+def test_numpy_get_pattern_matches_wordle(words):
+    wordle = Wordle()
+    for guess, target in it.product(REPEATED_LETTERS, words):
+        wordle._word = target
+        assert NumpyBackend.get_pattern(guess, target) == wordle.get_matches(guess)
+
+
+def test_numpy_compact_histogram_matches_dense(words):
+    patterns = NumpyBackend.pattern_matrix(to_array(words), to_array(words[:20]))
+    weights = np.random.default_rng(0).random(20)
+    for sample_weights in (None, weights):
+        dense = NumpyBackend.pattern_histogram(patterns, 243, sample_weights)
+        compact, hits = NumpyBackend.compact_histogram(patterns, 243, sample_weights)
+        assert compact.shape == (len(words), 20)
+        np.testing.assert_allclose(np.sort(compact, axis=1), np.sort(dense, axis=1)[:, -20:])
+        np.testing.assert_allclose(hits, dense[:, -1])
+
+
+def test_pattern_dtype_widens_with_word_length():
+    assert pattern_dtype(5) == np.uint8
+    assert pattern_dtype(6) == np.uint16
+    assert pattern_dtype(7) == np.uint16
+
+
+@requires_numba
+def test_numba_overrides():
+    assert overridden_kernels(NumbaBackend()) == ["pattern_matrix", "pattern_histogram", "get_patterns"]
+
+
+@requires_numba
+@pytest.mark.parametrize("n_l", [5, 6])
+def test_numba_pattern_matrix(words, n_l):
+    word_array = to_array(words) if n_l == 5 else to_array([word + word[0] for word in words])
+    expected = NumpyBackend.pattern_matrix(word_array, word_array)
+    result = NumbaBackend.pattern_matrix(word_array, word_array)
+    assert result.dtype == expected.dtype == pattern_dtype(n_l)
+    np.testing.assert_array_equal(result, expected)
+
+
+@requires_numba
+def test_numba_pattern_histogram(words):
+    patterns = NumpyBackend.pattern_matrix(to_array(words), to_array(words))
+    weights = np.random.default_rng(0).random(len(words))
+    np.testing.assert_array_equal(NumbaBackend.pattern_histogram(patterns, 243), NumpyBackend.pattern_histogram(patterns, 243))
+    np.testing.assert_allclose(NumbaBackend.pattern_histogram(patterns, 243, weights), NumpyBackend.pattern_histogram(patterns, 243, weights))
+
+
+@requires_numba
+def test_numba_get_patterns(words):
+    numba_backend, numpy_backend = NumbaBackend(), NumpyBackend()
+    for guess in words:
+        assert numba_backend.get_patterns(guess, words) == numpy_backend.get_patterns(guess, words)
+    assert numba_backend.get_pattern("eerie", "geese") == numpy_backend.get_pattern("eerie", "geese")
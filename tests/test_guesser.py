@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import yaml
+
+from guesser import Guesser
+from matrix_generator import PatternMatrixGenerator
+
+
+@pytest.fixture(scope="module")
+def word_list():
+    return yaml.load(open(Guesser.WORD_LIST), Loader=yaml.FullLoader)[:400]
+
+
+@pytest.fixture
+def make_guesser(tmp_path, monkeypatch, word_list):
+    # Keep the matrix of the shortened word list away from the cached one
+    monkeypatch.setattr(PatternMatrixGenerator, "PATTERN_MATRIX_FILE", str(tmp_path / "pattern_matrix_{n_l}.npy"))
+    monkeypatch.setattr(PatternMatrixGenerator, "OPENER_FILE", str(tmp_path / "opener_{n_l}.yaml"))
+    return lambda **options: Guesser('console', word_list=word_list, **options)
+
+
+@pytest.mark.parametrize("priors", [False, True])
+def test_entropy_bounds_hold(make_guesser, word_list, priors):
+    guesser = make_guesser(priors=priors, prune=False)
+    rng = np.random.default_rng(0)
+    rows = np.arange(len(word_list))
+    for n_targets in (3, 20, 100, len(word_list)):
+        target_indices = np.sort(rng.choice(len(word_list), n_targets, replace=False))
+        target_weights = None if guesser.priors is None else guesser.priors[target_indices]
+        entropies = guesser.score_rows(rows, target_indices, target_weights)
+        bounds = guesser.entropy_bounds(rows, target_indices, target_weights)
+        assert np.all(entropies <= bounds + Guesser.PRUNING_TOLERANCE)
+
+
+@pytest.mark.parametrize("policy", ["entropy", "minimax", "expected_size", "entropy=1,solve_probability=0.5"])
+def test_pruning_keeps_the_best_guess(make_guesser, word_list, policy):
+    pruned, full = make_guesser(policy=policy), make_guesser(policy=policy, prune=False)
+    rng = np.random.default_rng(1)
+    for n_targets in (3, 8, 30, 120):
+        targets = [word_list[i] for i in np.sort(rng.choice(len(word_list), n_targets, replace=False))]
+        pruned.target_words = full.target_words = targets
+        assert pruned.rank_guesses()[0] == full.rank_guesses()[0]
+
+
+@pytest.mark.parametrize("options", [{}, {"prune": False}, {"priors": True}])
+def test_threaded_blocks_match_a_single_block(make_guesser, word_list, options):
+    single = make_guesser(**options)
+    # 133 does not divide the 400 words, so the last block is shorter
+    with make_guesser(n_threads=4, block_size=133, **options) as threaded:
+        rng = np.random.default_rng(2)
+        for n_targets in (2, 10, 60, len(word_list)):
+            targets = [word_list[i] for i in np.sort(rng.choice(len(word_list), n_targets, replace=False))]
+            single.target_words = threaded.target_words = targets
+            expected, result = single.get_entropies(), threaded.get_entropies()
+            assert result.keys() == expected.keys()
+            np.testing.assert_allclose(list(result.values()), list(expected.values()))
+    assert threaded._executor is None
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+
+from matrix_generator import PatternMatrixGenerator
+
+
+def test_cached_matrix_is_rebuilt_for_another_word_list(tmp_path, monkeypatch):
+    monkeypatch.setattr(PatternMatrixGenerator, "PATTERN_MATRIX_FILE", str(tmp_path / "pattern_matrix_{n_l}.npy"))
+
+    first = PatternMatrixGenerator(["eerie", "geese", "speed"])
+    first.build_pattern_matrix(workers=1)
+    assert first.verify_pattern_matrix()
+
+    # Same word length, so the same file name, but another vocabulary
+    second = PatternMatrixGenerator(["abbey", "llama", "sassy", "kayak"])
+    assert not second.matches_vocabulary()
+    second.load_pattern_matrix()
+    assert second.grid.shape == (4, 4)
+    np.testing.assert_array_equal(second.grid, second.generate_pattern_matrix())
+    assert second.verify_pattern_matrix() and not first.verify_pattern_matrix()
+
+
+def test_saved_matrix_is_loaded_without_rebuilding(tmp_path, monkeypatch):
+    monkeypatch.setattr(PatternMatrixGenerator, "PATTERN_MATRIX_FILE", str(tmp_path / "pattern_matrix_{n_l}.npy"))
+    monkeypatch.setattr(PatternMatrixGenerator, "build_pattern_matrix", lambda self, *args: pytest.fail("rebuilt"))
+
+    generator = PatternMatrixGenerator(["eerie", "geese", "speed"])
+    pattern_matrix = generator.generate_pattern_matrix()
+    generator.save_pattern_matrix(pattern_matrix)
+    assert generator.verify_pattern_matrix()
+
+    generator.load_pattern_matrix()
+    np.testing.assert_array_equal(generator.grid, pattern_matrix)
+
+
+def test_matrix_without_checksum_is_rebuilt(tmp_path, monkeypatch):
+    monkeypatch.setattr(PatternMatrixGenerator, "PATTERN_MATRIX_FILE", str(tmp_path / "pattern_matrix_{n_l}.npy"))
+
+    generator = PatternMatrixGenerator(["eerie", "geese", "speed"])
+    np.save(generator.pattern_matrix_file, np.zeros((3, 3), dtype=generator.dtype))
+    generator.load_pattern_matrix()
+    np.testing.assert_array_equal(generator.grid, generator.generate_pattern_matrix())
+    assert generator.verify_pattern_matrix()
@@ -0,0 +1,84 @@
+import pytest
+import yaml
+from rich.console import Console
+
+from guesser import Guesser
+from matrix_generator import PatternMatrixGenerator
+from opener_search import OpenerSearch, search_opener
+from wordle import Wordle
+
+
+@pytest.fixture(scope="module")
+def word_list():
+    return yaml.load(open(Guesser.WORD_LIST), Loader=yaml.FullLoader)[:600]
+
+
+@pytest.fixture
+def make_guesser(tmp_path, monkeypatch, word_list):
+    # Keep the matrix and opener of the shortened word list away from the cached ones
+    monkeypatch.setattr(PatternMatrixGenerator, "PATTERN_MATRIX_FILE", str(tmp_path / "pattern_matrix_{n_l}.npy"))
+    monkeypatch.setattr(PatternMatrixGenerator, "OPENER_FILE", str(tmp_path / "opener_{n_l}.yaml"))
+    return lambda **options: Guesser('console', word_list=word_list, **options)
+
+
+def play_games(guesser, opener, word_list):
+    """Plays a game against every target word, returning the total number of guesses."""
+    total = 0
+    for target in word_list:
+        wordle = Wordle(word_list)
+        wordle._word = target
+        guesser.restart_game(do_print=False)
+        guesser.first_guess = opener
+        result, end_game = None, False
+        while not end_game:
+            result, end_game = wordle.check_guess(guesser.get_guess(result, do_print=False), do_print=False)
+            total += 1
+    return total
+
+
+# 'trade' reaches buckets where the pattern matrix and Wordle disagree on repeated letters
+@pytest.mark.parametrize("opener", ["trade", "slate"])
+def test_evaluate_matches_played_games(make_guesser, word_list, opener):
+    guesser = make_guesser()
+    stats = OpenerSearch(guesser).evaluate(opener)
+    assert stats["failures"] == 0
+    assert stats["total_guesses"] == play_games(guesser, opener, word_list)
+
+
+def test_search_finds_the_best_opener(make_guesser, word_list):
+    guesser = make_guesser()
+    openers = OpenerSearch(guesser).candidate_openers(8)
+    results = {opener: OpenerSearch(guesser).evaluate(opener) for opener in openers}
+    best = min(openers, key=lambda opener: (results[opener]["total_guesses"], opener))
+
+    # The shared bound stops most evaluations early, but must not change the winner
+    opener, stats, settings = search_opener(8, workers=2, console=Console(quiet=True), word_list=word_list)
+    assert (opener, stats) == (best, results[best])
+    assert settings == guesser.opener_settings()
+
+
+def test_search_breaks_ties_by_name(tmp_path, monkeypatch):
+    monkeypatch.setattr(PatternMatrixGenerator, "PATTERN_MATRIX_FILE", str(tmp_path / "pattern_matrix_{n_l}.npy"))
+    monkeypatch.setattr(PatternMatrixGenerator, "OPENER_FILE", str(tmp_path / "opener_{n_l}.yaml"))
+    # No letter in common: every opener takes 1 + 2 + 3 guesses, and 'klmno' is evaluated first
+    word_list = ["klmno", "fghij", "abcde"]
+
+    opener, stats, _ = search_opener(workers=1, console=Console(quiet=True), word_list=word_list)
+    assert opener == "abcde"
+    assert stats["total_guesses"] == 6
+
+
+def test_cached_opener_only_applies_to_its_vocabulary_and_settings(make_guesser, word_list):
+    guesser = make_guesser()
+    opener = next(word for word in word_list if word != guesser.first_guess)
+    guesser.pattern_matrix_generator.save_opener(opener, guesser.opener_settings(), {"total_guesses": 1})
+
+    assert make_guesser().first_guess == opener
+    assert make_guesser(policy="minimax").first_guess != opener
+    assert make_guesser(priors=True).first_guess != opener
+    assert make_guesser(endgame_size=3).first_guess != opener
+
+    # Same word length, so the same opener file, but another vocabulary
+    other = Guesser('console', word_list=word_list[1:])
+    assert other.pattern_matrix_generator.load_opener(guesser.opener_settings()) is None
+    assert other.first_guess != opener
@@ -1,4 +1,4 @@
-from random import choice
+from random import choice, choices
 import yaml, os
 from collections import Counter
 from rich.console import Console
@@ -12,8 +12,12 @@ class Wordle:
     word_list = yaml.load(open(WORD_LIST), Loader=yaml.FullLoader)
     #word_list = open('wordle_list.txt').read().splitlines()
 
-    def __init__(self):
-        self._word = choice(word_list)
+    def __init__(self, words=None, weights=None):
+        """Start a game with a secret word drawn from `words`, or from the 5-letter word list,
+        uniformly or according to `weights` (one per word)."""
+        self.words = words or word_list
+        self.weights = weights
+        self._word = self.draw_word()
         # self._word = "wound"
         self._tried = []
         self.console = Console()  # Console object for interactive output
@@ -21,11 +25,17 @@ class Wordle:
 
     def restart_game(self):
         #ws = ["stare", "stale", "stake", "stave", "stage", "stale"]
-        self._word = choice(word_list)
+        self._word = self.draw_word()
         self._tried = []
         self._endgame = False
 
 
+    def draw_word(self):
+        """Draw a secret word, according to the weights if any."""
+        if self.weights is None:
+            return choice(self.words)
+        return choices(self.words, weights=self.weights)[0]
+
     def get_matches(self, guess):
         # Produces the feedback string
         counts = Counter(self._word)
@@ -53,8 +63,8 @@ class Wordle:
         # check if the guess is valid
         if not guess.isalpha():
             return "Please enter only letters", False
-        if len(guess) != 5:
-            return "Please enter a five-letter word", False
+        if len(guess) != len(self._word):
+            return f"Please enter a {len(self._word)}-letter word", False
         elif guess in self._tried:
             return "You have already tried that word", False
         else: